@@ -0,0 +1,57 @@
+"""
+Measure how decode throughput scales with the number of threads, both with and
+without a shared QueryCache. Near linear scaling is only expected on free-threaded
+builds of python (e.g. python3.13t), as the GIL serializes the decoding itself.
+
+Usage: python -m benchmarks.thread_scaling [max_threads] [calls_per_thread]
+"""
+import sys
+import sysconfig
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from json_urley import QueryCache, query_str_to_json_obj
+
+QUERY_STRS = [
+    f"page={i % 10}&sort=name&filter.tags=a&filter.tags=b&q=search+{i % 50}"
+    for i in range(200)
+]
+
+
+def run(num_threads: int, calls_per_thread: int, decode) -> float:
+    def work(offset: int):
+        for i in range(calls_per_thread):
+            decode(QUERY_STRS[(offset + i) % len(QUERY_STRS)])
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        list(executor.map(work, range(num_threads)))
+    return num_threads * calls_per_thread / (perf_counter() - start)
+
+
+def main():
+    max_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    calls_per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    gil_disabled = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(f"python {sys.version.split()[0]}, free-threaded: {gil_disabled}")
+    cache = QueryCache(max_size=1024)
+    decoders = {
+        "uncached": query_str_to_json_obj,
+        "cached": cache.query_str_to_json_obj,
+    }
+    for name, decode in decoders.items():
+        baseline = None
+        num_threads = 1
+        while num_threads <= max_threads:
+            throughput = run(num_threads, calls_per_thread, decode)
+            baseline = baseline or throughput
+            print(
+                f"{name:>8} threads={num_threads:<3} {throughput:>12,.0f} calls/s"
+                f"  speedup={throughput / baseline:.2f}x"
+            )
+            num_threads *= 2
+    print(cache.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,28 @@
+import dataclasses
 import math
+from collections.abc import Mapping, Sequence
 from decimal import Decimal
-from typing import Dict, List, Iterator, Tuple
+from typing import Any, Callable, Dict, List, Iterator, Tuple, Optional
 from urllib.parse import urlencode, parse_qsl
 
 from json_urley.json_urley_error import JsonUrleyError
-from json_urley._path_element import parse_path, PathElement
+from json_urley.query_diff import QueryDiff
+from json_urley.query_cache import QueryCache, QueryCacheStats
+from json_urley._path_element import parse_path, PathElement, _get_typed_value
+from json_urley._encoder_registry import EncoderRegistry
+
+# Bytes which urlencode leaves as a single character. (Spaces become "+")
+_QUOTE_PLUS_SAFE = (
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~ "
+)
+_SCALAR_TYPES = (bool, int, float, Decimal, str)
+_NATIVE_TYPES = _SCALAR_TYPES + (dict, list)
+# Sequences which should not be encoded as arrays
+_BINARY_TYPES = (bytes, bytearray, memoryview)
+_ENCODERS = EncoderRegistry()
+# Includes negative results (None), so each type is only resolved once
+_DATACLASS_FIELD_NAMES: Dict[type, Optional[Tuple[str, ...]]] = {}
+_UNRESOLVED = object()
 
 
 def query_str_to_json_obj(query: str) -> Dict:
@@ -18,10 +36,22 @@ def query_str_to_json_obj(query: str) -> Dict:
 
 
 def query_params_to_json_obj(params: List[Tuple[str, str]]) -> Dict:
-    result = {}
+    result = extend_json_obj({}, params)
+    return result
+
+
+def extend_json_obj(result: Dict, params: List[Tuple[str, str]]) -> Dict:
+    """
+    Append params to an already decoded result in place, exactly as if they had been
+    at the end of the query it was decoded from.
+    """
     for key, value in params:
-        path = parse_path(key)
-        _append_param(path, value, result)
+        if not key or "." in key or "~" in key:
+            path = parse_path(key)
+            _append_param(path, value, result)
+        else:
+            # Flat keys have no hints or nesting, so skip parsing and the container walk
+            _append_value_to_dict(key, _get_typed_value(value), result)
     return result
 
 
@@ -45,14 +75,19 @@ def _append_param(path: List[PathElement], value: str, result: Dict):
         parent.append(typed_value)
     elif not isinstance(parent, dict):
         raise JsonUrleyError(f"path_mismatch:{path_element_}")
-    elif path_element_.key in parent:
-        existing_value = parent[path_element_.key]
+    else:
+        _append_value_to_dict(path_element_.key, typed_value, parent)
+
+
+def _append_value_to_dict(key: str, typed_value, parent: Dict):
+    if key in parent:
+        existing_value = parent[key]
         if isinstance(existing_value, list):
             existing_value.append(typed_value)
         else:
-            parent[path_element_.key] = [existing_value, typed_value]
+            parent[key] = [existing_value, typed_value]
     else:
-        parent[path_element_.key] = typed_value
+        parent[key] = typed_value
 
 
 def _append_param_to_list(path_element_: PathElement, parent: List):
@@ -74,52 +109,364 @@ def _append_param_to_dict(path_element_: PathElement, parent: Dict):
     return child
 
 
-def json_obj_to_query_params(json_obj: Dict) -> List[Tuple[str, str]]:
-    if json_obj:
-        result = list(_generate_query_params(json_obj, [], False))
-    else:
-        result = []
+def validate_query(query: str) -> Optional[Tuple[int, JsonUrleyError]]:
+    params = parse_qsl(query, keep_blank_values=True)
+    result = validate_query_params(params)
     return result
 
 
-def json_obj_to_query_str(json_obj: Dict) -> str:
+def validate_query_params(
+    params: List[Tuple[str, str]]
+) -> Optional[Tuple[int, JsonUrleyError]]:
+    """
+    Check that params would decode without building the resulting object. Only the
+    container kind at each path is tracked: dicts for objects, lists holding at most
+    their last element for arrays and None for everything else. Returns the index of
+    the first invalid param along with the error, or None if the params are valid.
+    """
+    shape = {}
+    for index, (key, value) in enumerate(params):
+        try:
+            if not key or "." in key or "~" in key:
+                _append_param_shape(parse_path(key), value, shape)
+            else:
+                _append_shape_to_dict(key, None, shape)
+        except JsonUrleyError as e:
+            return index, e
+    return None
+
+
+def _append_param_shape(path: List[PathElement], value: str, shape: Dict):
+    parent = shape
+    for path_element_ in path[:-1]:
+        if path_element_.type_hint not in (None, "a"):
+            raise JsonUrleyError(f"invalid_element:{path_element_}")
+        if isinstance(parent, list):
+            parent = _append_param_shape_to_list(path_element_, parent)
+        elif isinstance(parent, dict):
+            parent = _append_param_to_dict(path_element_, parent)
+        else:
+            raise JsonUrleyError(f"path_mismatch:{path_element_}")
+
+    path_element_ = path[-1]
+    value_shape = _get_value_shape(path_element_, value)
+    if isinstance(parent, list):
+        if path_element_.key not in ("e", "n"):
+            raise JsonUrleyError(f"path_mismatch:{path_element_}")
+        _set_last_shape(value_shape, parent)
+    elif not isinstance(parent, dict):
+        raise JsonUrleyError(f"path_mismatch:{path_element_}")
+    else:
+        _append_shape_to_dict(path_element_.key, value_shape, parent)
+
+
+def _get_value_shape(path_element_: PathElement, value: str):
+    if not path_element_.type_hint:
+        # Values without a type hint are always scalars
+        return None
+    typed_value = path_element_.get_typed_value(value)
+    if isinstance(typed_value, (list, dict)):
+        # Empty containers are their own shape
+        return typed_value
+    return None
+
+
+def _append_shape_to_dict(key: str, value_shape, parent: Dict):
+    if key in parent:
+        existing_shape = parent[key]
+        if isinstance(existing_shape, list):
+            _set_last_shape(value_shape, existing_shape)
+        else:
+            parent[key] = [value_shape]
+    else:
+        parent[key] = value_shape
+
+
+def _append_param_shape_to_list(path_element_: PathElement, parent: List):
+    if path_element_.key == "e" and parent:
+        return parent[-1]
+    if path_element_.key in ("e", "n"):
+        child = [] if path_element_.type_hint == "a" else {}
+        _set_last_shape(child, parent)
+        return child
+    raise JsonUrleyError(f"path_mismatch:{path_element_}")
+
+
+def _set_last_shape(shape, parent: List):
+    if parent:
+        parent[-1] = shape
+    else:
+        parent.append(shape)
+
+
+def json_obj_to_query_params(json_obj: Any) -> List[Tuple[str, str]]:
+    """
+    Encode a top level object, which may be a dict, mapping, dataclass or an instance of
+    a type with a registered encoder.
+    """
+    if isinstance(json_obj, dict):
+        return _generate_dict_query_params(json_obj)
+    return list(_iter_query_params(json_obj))
+
+
+def json_obj_to_query_str(json_obj: Any) -> str:
     query_params = json_obj_to_query_params(json_obj)
     result = urlencode(query_params)
     return result
 
 
+def diff_query_params(old_obj: Dict, new_obj: Dict) -> QueryDiff:
+    """
+    Get the params which need to change to move a query from old_obj to new_obj. To
+    update a list of query params, drop any in diff.removed and append diff.added.
+    """
+    diff = QueryDiff()
+    for key, old_value in old_obj.items():
+        if key not in new_obj or not _is_same_json(old_value, new_obj[key]):
+            diff.removed.extend(json_obj_to_query_params({key: old_value}))
+    for key, new_value in new_obj.items():
+        if key not in old_obj or not _is_same_json(old_obj[key], new_value):
+            diff.added.extend(json_obj_to_query_params({key: new_value}))
+    return diff
+
+
+def apply_query_diff(json_obj: Dict, diff: QueryDiff) -> Dict:
+    """
+    Update a decoded json_obj in place with a diff, as if the query it was decoded from
+    had been updated and decoded again.
+    """
+    for key, _ in diff.removed:
+        # An empty key can only come from encoding an empty top level key
+        json_obj.pop(parse_path(key)[0].key if key else "", None)
+    extend_json_obj(json_obj, diff.added)
+    return json_obj
+
+
+def _is_same_json(a, b) -> bool:
+    # Stricter than ==, as values like 1, 1.0 and True are encoded differently
+    if type(a) is not type(b):
+        return False
+    if a is None or isinstance(a, _SCALAR_TYPES):
+        return a == b
+    if isinstance(a, dict):
+        return _is_same_mapping(a, b)
+    if isinstance(a, list):
+        return _is_same_sequence(a, b)
+    return _is_same_object(a, b)
+
+
+def _is_same_object(a, b) -> bool:
+    # Checks types in the same order as _generate_query_params_for_object
+    if _get_encoder(type(a)):
+        # The encoded values of other types can not be compared without encoding them
+        return False
+    field_names = _get_dataclass_field_names(type(a))
+    if field_names is not None:
+        return all(
+            _is_same_json(getattr(a, name), getattr(b, name)) for name in field_names
+        )
+    if isinstance(a, Mapping):
+        return _is_same_mapping(a, b)
+    if isinstance(a, Sequence) and not isinstance(a, _BINARY_TYPES):
+        return _is_same_sequence(a, b)
+    return False
+
+
+def _is_same_mapping(a: Mapping, b: Mapping) -> bool:
+    return a.keys() == b.keys() and all(
+        _is_same_json(value, b[key]) for key, value in a.items()
+    )
+
+
+def _is_same_sequence(a: Sequence, b: Sequence) -> bool:
+    return len(a) == len(b) and all(map(_is_same_json, a, b))
+
+
+def estimate_query_length(json_obj: Any) -> int:
+    """
+    Get the exact length of the query string json_obj_to_query_str would produce,
+    without building it.
+    """
+    length = 0
+    for key, value in _iter_query_params(json_obj):
+        if length:
+            length += 1  # "&" separator
+        length += _quoted_length(key) + 1 + _quoted_length(value)
+    return length
+
+
+def fits_in(json_obj: Any, max_len: int) -> bool:
+    """
+    Determine whether the query string for json_obj would be at most max_len characters
+    long, stopping as soon as the budget is exceeded.
+    """
+    length = 0
+    for key, value in _iter_query_params(json_obj):
+        if length:
+            length += 1  # "&" separator
+        length += _quoted_length(key) + 1 + _quoted_length(value)
+        if length > max_len:
+            return False
+    return True
+
+
+def _iter_query_params(json_obj: Any) -> Iterator[Tuple[str, str]]:
+    # Falsy top level values (None, empty containers...) produce no params
+    if not json_obj:
+        return iter(())
+    return _generate_query_params(json_obj, [], False)
+
+
+def _quoted_length(value: str) -> int:
+    encoded = value.encode("utf-8")
+    # Every unsafe byte becomes a 3 character %XX escape
+    return len(encoded) + 2 * len(encoded.translate(None, _QUOTE_PLUS_SAFE))
+
+
+def register_encoder(type_: type, encoder: Callable[[Any], Any]):
+    """
+    Register a function converting instances of type_ (and its subclasses) into a value
+    which may be encoded: a scalar, dict, list, mapping, sequence or dataclass. Encoders
+    are not consulted for dicts, lists or scalars. Encoding which is already under way
+    while an encoder is registered may or may not use it.
+    """
+    _ENCODERS.register(type_, encoder)
+
+
 def _generate_query_params(
     json_obj, current_param: List[str], is_nested_list: bool
 ) -> Iterator[Tuple[str, str]]:
     if json_obj is None:
         yield ".".join(current_param), "null"
     elif isinstance(json_obj, dict):
-        if not json_obj:
-            yield ".".join(current_param) + "~o", ""
-            return
-        for key, value in json_obj.items():
-            key = key.replace("~", "~~").replace(".", "~.")
-            current_param.append(key)
-            yield from _generate_query_params(value, current_param, False)
-            current_param.pop()
+        yield from _generate_query_params_for_items(
+            json_obj.items(), not json_obj, current_param
+        )
     elif isinstance(json_obj, list):
         yield from _generate_query_params_for_list(
             json_obj, current_param, is_nested_list
         )
-    elif isinstance(json_obj, bool):
-        key = ".".join(current_param)
-        json_obj = "true" if json_obj else "false"
-        yield key, json_obj
-    elif isinstance(json_obj, (int, float, Decimal)):
-        key = ".".join(current_param)
-        value = _number_to_str(json_obj)
-        yield key, value
-    elif isinstance(json_obj, str):
-        yield from _generate_query_params_for_str(json_obj, current_param)
+    elif isinstance(json_obj, _SCALAR_TYPES):
+        yield _scalar_to_query_param(".".join(current_param), json_obj)
+    else:
+        yield from _generate_query_params_for_object(
+            json_obj, current_param, is_nested_list
+        )
+
+
+def _generate_query_params_for_items(
+    items, is_empty: bool, current_param: List[str]
+) -> Iterator[Tuple[str, str]]:
+    if is_empty:
+        # The top level object is implied, so it needs no param when empty
+        if current_param:
+            yield ".".join(current_param) + "~o", ""
+        return
+    for key, value in items:
+        current_param.append(_escape_key(key))
+        yield from _generate_query_params(value, current_param, False)
+        current_param.pop()
+
+
+def _generate_query_params_for_object(
+    json_obj, current_param: List[str], is_nested_list: bool
+) -> Iterator[Tuple[str, str]]:
+    encoder = _get_encoder(type(json_obj))
+    if encoder:
+        yield from _generate_query_params(
+            encoder(json_obj), current_param, is_nested_list
+        )
+        return
+    field_names = _get_dataclass_field_names(type(json_obj))
+    if field_names is not None:
+        # Read fields directly rather than building a dict with dataclasses.asdict
+        items = ((name, getattr(json_obj, name)) for name in field_names)
+        yield from _generate_query_params_for_items(
+            items, not field_names, current_param
+        )
+    elif isinstance(json_obj, Mapping):
+        yield from _generate_query_params_for_items(
+            json_obj.items(), not json_obj, current_param
+        )
+    elif isinstance(json_obj, Sequence) and not isinstance(json_obj, _BINARY_TYPES):
+        yield from _generate_query_params_for_list(
+            json_obj, current_param, is_nested_list
+        )
     else:
         raise JsonUrleyError(f"unexpected_type:{json_obj}")
 
 
+def _get_encoder(type_: type) -> Optional[Callable[[Any], Any]]:
+    return _ENCODERS.get(type_)
+
+
+def _apply_encoder(json_obj):
+    if json_obj is None or isinstance(json_obj, _NATIVE_TYPES):
+        return json_obj
+    encoder = _get_encoder(type(json_obj))
+    return encoder(json_obj) if encoder else json_obj
+
+
+def _get_dataclass_field_names(type_: type) -> Optional[Tuple[str, ...]]:
+    field_names = _DATACLASS_FIELD_NAMES.get(type_, _UNRESOLVED)
+    if field_names is _UNRESOLVED:
+        field_names = None
+        if dataclasses.is_dataclass(type_):
+            field_names = tuple(f.name for f in dataclasses.fields(type_))
+        _DATACLASS_FIELD_NAMES[type_] = field_names
+    return field_names
+
+
+def _generate_dict_query_params(json_obj: Dict) -> List[Tuple[str, str]]:
+    """
+    Encode a top level dict. Items with keys which need no escaping and values which are
+    scalars or lists of at least 2 scalars are encoded directly, and anything else is
+    passed to the general encoder. (Top level items are independent of one another)
+    """
+    result = []
+    for key, value in json_obj.items():
+        if isinstance(key, str) and "~" not in key and "." not in key:
+            start = len(result)
+            if _append_flat_query_params(key, value, result):
+                continue
+            del result[start:]
+        result.extend(_generate_query_params(value, [_escape_key(key)], False))
+    return result
+
+
+def _append_flat_query_params(key: str, value, result: List[Tuple[str, str]]) -> bool:
+    if isinstance(value, list):
+        if len(value) < 2:
+            return False
+        for item in value:
+            param = _scalar_to_query_param(key, item)
+            if param is None:
+                return False
+            result.append(param)
+        return True
+    param = _scalar_to_query_param(key, value)
+    if param is None:
+        return False
+    result.append(param)
+    return True
+
+
+def _escape_key(key: str) -> str:
+    return key.replace("~", "~~").replace(".", "~.")
+
+
+def _scalar_to_query_param(key: str, json_obj) -> Optional[Tuple[str, str]]:
+    if json_obj is None:
+        return key, "null"
+    if isinstance(json_obj, bool):
+        return key, "true" if json_obj else "false"
+    if isinstance(json_obj, (int, float, Decimal)):
+        return key, _number_to_str(json_obj)
+    if isinstance(json_obj, str):
+        return _str_to_query_param(key, json_obj)
+    return None
+
+
 def _number_to_str(value):
     if math.isnan(value):
         return "NaN"
@@ -131,13 +478,19 @@ def _number_to_str(value):
 
 
 def _generate_query_params_for_list(
-    json_obj: List, current_param: List[str], is_nested_list: bool
+    json_obj: Sequence, current_param: List[str], is_nested_list: bool
 ):
     if not json_obj:
         yield ".".join(current_param) + "~a", ""
         return
 
-    has_nested = next((True for i in json_obj if isinstance(i, (list, dict))), False)
+    if _ENCODERS:
+        # Encode items up front so their shape is known, without encoding them twice
+        json_obj = [_apply_encoder(item) for item in json_obj]
+    has_nested = next(
+        (True for i in json_obj if i is not None and not isinstance(i, _SCALAR_TYPES)),
+        False,
+    )
     is_single_item_array = len(json_obj) == 1
 
     if not has_nested and not is_nested_list and not is_single_item_array:
@@ -167,8 +520,7 @@ def _generate_query_params_for_list(
         current_param.pop()
 
 
-def _generate_query_params_for_str(json_obj: str, current_param: List[str]):
-    key = ".".join(current_param)
+def _str_to_query_param(key: str, json_obj: str) -> Tuple[str, str]:
     if json_obj in ("true", "false", "null"):
         key += "~s"
     try:
@@ -180,4 +532,4 @@ def _generate_query_params_for_str(json_obj: str, current_param: List[str]):
             key += "~s"
         except ValueError:
             pass
-    yield key, json_obj
+    return key, json_obj
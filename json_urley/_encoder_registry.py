@@ -0,0 +1,39 @@
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_UNRESOLVED = object()
+
+
+class EncoderRegistry:
+    """
+    Encoders registered by type, along with a cache of the encoder resolved for each type
+    looked up (None if there is none). Both are replaced together in a single assignment
+    whenever an encoder is registered, so a lookup racing a registration can only store
+    its result in the cache of the version it read, and never leaves a stale result in
+    the current one.
+    """
+
+    def __init__(self):
+        self.state: Tuple[
+            Dict[type, Callable[[Any], Any]], Dict[type, Optional[Callable[[Any], Any]]]
+        ] = ({}, {})
+        self._lock = Lock()
+
+    def register(self, type_: type, encoder: Callable[[Any], Any]):
+        with self._lock:
+            encoders = dict(self.state[0])
+            encoders[type_] = encoder
+            self.state = (encoders, {})
+
+    def get(self, type_: type) -> Optional[Callable[[Any], Any]]:
+        encoders, resolved_encoders = self.state
+        if not encoders:
+            return None
+        encoder = resolved_encoders.get(type_, _UNRESOLVED)
+        if encoder is _UNRESOLVED:
+            encoder = next((encoders[t] for t in type_.__mro__ if t in encoders), None)
+            resolved_encoders[type_] = encoder
+        return encoder
+
+    def __bool__(self):
+        return bool(self.state[0])
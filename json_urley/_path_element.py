@@ -28,6 +28,8 @@ def parse_path(path: str) -> List[PathElement]:
         next_tilda = _next_index_of(path, "~", current_index)
         next_dot = _next_index_of(path, ".", current_index)
         if next_tilda < next_dot:
+            if next_tilda + 1 == len(path):
+                raise JsonUrleyError(f"invalid_path:{path}")
             if path[next_tilda + 1] in ("~", "."):
                 current_key.append(path[current_index:next_tilda])
                 current_key.append(path[next_tilda + 1])
@@ -52,6 +54,8 @@ def parse_path(path: str) -> List[PathElement]:
                 current_key.append(path[current_index:])
             if current_key:
                 elements.append(PathElement("".join(current_key)))
+            if not elements:
+                raise JsonUrleyError(f"invalid_path:{path}")
             return elements
 
 
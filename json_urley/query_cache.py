@@ -0,0 +1,120 @@
+# pylint: disable=R0401
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from threading import Lock
+from time import monotonic
+from types import MappingProxyType
+from typing import Mapping, Optional, Union
+
+import json_urley
+
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of decoded query strings, keyed by the raw query str or bytes, with
+    optional expiry after ttl seconds. Results are shared between callers, so they are
+    deeply frozen: objects become read-only mappings and arrays become tuples.
+
+    The cache is thread safe. Entries are spread over independently locked shards by
+    hash so that threads rarely contend, with max_size split between the shards and each
+    shard evicting its own least recently used entries. A max_size of 0 disables caching.
+    """
+
+    def __init__(
+        self, max_size: int = 256, ttl: Optional[float] = None, shards: int = 16
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        shards = max(min(shards, max_size), 1)
+        shard_size, remainder = divmod(max_size, shards)
+        self._shards = tuple(
+            _QueryCacheShard(shard_size + (1 if i < remainder else 0))
+            for i in range(shards)
+        )
+
+    def query_str_to_json_obj(self, query: Union[str, bytes]) -> Mapping:
+        shard = self._shards[hash(query) % len(self._shards)]
+        now = monotonic()
+        result = shard.get(query, now)
+        if result is not None:
+            return result
+        query_str = query.decode("utf-8") if isinstance(query, bytes) else query
+        result = _freeze(json_urley.query_str_to_json_obj(query_str))
+        if shard.max_size:
+            expires_at = None if self.ttl is None else now + self.ttl
+            shard.put(query, expires_at, result)
+        return result
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    @property
+    def stats(self) -> QueryCacheStats:
+        result = QueryCacheStats()
+        for shard in self._shards:
+            stats = shard.get_stats()
+            result.hits += stats.hits
+            result.misses += stats.misses
+            result.evictions += stats.evictions
+        return result
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+
+class _QueryCacheShard:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.stats = QueryCacheStats()
+        self.lock = Lock()
+
+    def get(self, query: Union[str, bytes], now: float) -> Optional[Mapping]:
+        with self.lock:
+            entry = self.entries.get(query)
+            if entry:
+                expires_at, result = entry
+                if expires_at is None or now < expires_at:
+                    self.entries.move_to_end(query)
+                    self.stats.hits += 1
+                    return result
+                del self.entries[query]
+                self.stats.evictions += 1
+            self.stats.misses += 1
+            return None
+
+    def put(self, query: Union[str, bytes], expires_at: Optional[float], result):
+        with self.lock:
+            self.entries[query] = (expires_at, result)
+            self.entries.move_to_end(query)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def get_stats(self) -> QueryCacheStats:
+        with self.lock:
+            return replace(self.stats)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def _freeze(json_obj):
+    if isinstance(json_obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in json_obj.items()})
+    if isinstance(json_obj, list):
+        return tuple(_freeze(item) for item in json_obj)
+    return json_obj
@@ -0,0 +1,14 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+@dataclass
+class QueryDiff:
+    """
+    Params to remove from and add to a query to move it from one json state to another.
+    Changed top level keys have all of their old params removed and all of their new
+    params added, so params for unchanged keys are never re-encoded.
+    """
+
+    removed: List[Tuple[str, str]] = field(default_factory=list)
+    added: List[Tuple[str, str]] = field(default_factory=list)
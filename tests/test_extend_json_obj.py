@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from json_urley import query_str_to_json_obj, extend_json_obj, JsonUrleyError
+
+
+class TestExtendJsonObj(TestCase):
+    def test_matches_single_decode(self):
+        query_strs = [
+            ("a=1", "a=2"),
+            ("a=1&a=2", "a=3"),
+            ("a.b=1", "a.c=2&a.b=3"),
+            ("foo~a.n.c=a", "foo.e.d=b"),
+            ("foo~a.n.c=a", "foo.n.c=b"),
+            ("foo~a.n~a.n=1", "foo.e.e=2&foo.e.n=3"),
+        ]
+        for query_str, extra_query_str in query_strs:
+            expected = query_str_to_json_obj(f"{query_str}&{extra_query_str}")
+            result = query_str_to_json_obj(query_str)
+            extra_params = [tuple(p.split("=")) for p in extra_query_str.split("&")]
+            self.assertIs(result, extend_json_obj(result, extra_params))
+            self.assertEqual(expected, result)
+
+    def test_mismatch(self):
+        result = query_str_to_json_obj("a~a=")
+        with self.assertRaises(JsonUrleyError):
+            extend_json_obj(result, [("a.b", "1")])
@@ -0,0 +1,61 @@
+from datetime import datetime
+from unittest import TestCase
+
+from json_urley import (
+    query_params_to_json_obj,
+    json_obj_to_query_params,
+    _append_param,
+    _generate_query_params,
+    JsonUrleyError,
+)
+from json_urley._path_element import parse_path
+
+
+def _general_decode(params):
+    result = {}
+    for key, value in params:
+        _append_param(parse_path(key), value, result)
+    return result
+
+
+def _general_encode(json_obj):
+    return list(_generate_query_params(json_obj, [], False))
+
+
+class TestFlatFastPath(TestCase):
+    def test_decode_matches_general(self):
+        params_list = [
+            [("a", "1"), ("b", "true"), ("c", "null"), ("d", "1.5"), ("e", "foo")],
+            [("a", "1"), ("a", "2"), ("a", "x")],
+            [("a", "1"), ("b.c", "2"), ("a", "3"), ("d~s", "4")],
+            [("a~a", ""), ("a", "1"), ("a", "2")],
+            [("a.b", "1"), ("a", "2")],
+        ]
+        for params in params_list:
+            self.assertEqual(_general_decode(params), query_params_to_json_obj(params))
+
+    def test_encode_matches_general(self):
+        json_objs = [
+            {"a": 1, "b": True, "c": None, "d": 1.5, "e": "foo", "f": "1"},
+            {"a": [1, 2, "3"], "b": False},
+            {"a": [1], "b": 2},
+            {"a": [], "b": 2},
+            {"a": [1, [2]], "b": 2},
+            {"a": {"b": 1}},
+            {"a.b": 1},
+            {"a~b": 1},
+            {"page": 1, "sort": "name", "q": "x", "f": {"t": [1, 2]}},
+            {"a": [1, 2], "b": [3, {"c": 4}], "d~e": [5, 6], "f": 7},
+        ]
+        for json_obj in json_objs:
+            self.assertEqual(
+                _general_encode(json_obj), json_obj_to_query_params(json_obj)
+            )
+
+    def test_encode_unexpected_type_falls_back(self):
+        with self.assertRaises(JsonUrleyError):
+            json_obj_to_query_params({"a": datetime.now()})
+        with self.assertRaises(JsonUrleyError):
+            json_obj_to_query_params({"a": [1, datetime.now()]})
+        with self.assertRaises(AttributeError):
+            json_obj_to_query_params({1: 2})
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import List, Optional
+from unittest import TestCase
+
+from json_urley import (
+    json_obj_to_query_str,
+    json_obj_to_query_params,
+    query_str_to_json_obj,
+    register_encoder,
+    JsonUrleyError,
+    QueryCache,
+    _ENCODERS,
+    _DATACLASS_FIELD_NAMES,
+)
+
+
+@dataclass
+class Tag:
+    name: str
+    weight: float = 1.0
+
+
+@dataclass
+class Search:
+    q: str
+    page: int = 1
+    tags: List[Tag] = field(default_factory=list)
+    parent: Optional["Search"] = None
+
+
+@dataclass
+class Empty:
+    pass
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class TestNativeEncoding(TestCase):
+    def assert_same_encoding(self, native_obj, json_obj):
+        self.assertEqual(
+            json_obj_to_query_str(json_obj), json_obj_to_query_str(native_obj)
+        )
+
+    def test_dataclass(self):
+        search = Search("shoes", tags=[Tag("red"), Tag("sale", 2.5)])
+        json_obj = {
+            "q": "shoes",
+            "page": 1,
+            "tags": [{"name": "red", "weight": 1.0}, {"name": "sale", "weight": 2.5}],
+            "parent": None,
+        }
+        self.assert_same_encoding(search, json_obj)
+        self.assertEqual(("name", "weight"), _DATACLASS_FIELD_NAMES[Tag])
+        self.assertEqual(json_obj, query_str_to_json_obj(json_obj_to_query_str(search)))
+
+    def test_empty_dataclass(self):
+        self.assert_same_encoding({"a": Empty()}, {"a": {}})
+
+    def test_mapping(self):
+        self.assert_same_encoding(
+            MappingProxyType({"a": 1, "b": {}}), {"a": 1, "b": {}}
+        )
+        self.assert_same_encoding({"a": MappingProxyType({})}, {"a": {}})
+
+    def test_sequence(self):
+        self.assert_same_encoding({"a": (1, 2)}, {"a": [1, 2]})
+        self.assert_same_encoding({"a": (1,)}, {"a": [1]})
+        self.assert_same_encoding({"a": ()}, {"a": []})
+        self.assert_same_encoding({"a": [(1, 2), range(3)]}, {"a": [[1, 2], [0, 1, 2]]})
+
+    def test_cached_result(self):
+        query_str = "a=1&b~a.n.c=x&b.n.c=y&d~o=&e~a="
+        cached = QueryCache().query_str_to_json_obj(query_str)
+        self.assert_same_encoding(cached, query_str_to_json_obj(query_str))
+
+    def test_non_dataclass_cached(self):
+        json_obj_to_query_str({"a": (1, 2)})
+        self.assertIn(tuple, _DATACLASS_FIELD_NAMES)
+        self.assertIsNone(_DATACLASS_FIELD_NAMES[tuple])
+
+    def test_empty_top_level(self):
+        for json_obj in ({}, MappingProxyType({}), Empty(), (), [], None, 0, "", False):
+            self.assertEqual([], json_obj_to_query_params(json_obj))
+            self.assertEqual("", json_obj_to_query_str(json_obj))
+
+    def test_binary(self):
+        with self.assertRaises(JsonUrleyError):
+            json_obj_to_query_str({"a": b"ab"})
+
+    def register_encoder(self, type_, encoder):
+        self.addCleanup(setattr, _ENCODERS, "state", _ENCODERS.state)
+        register_encoder(type_, encoder)
+
+    def test_encoder(self):
+        self.register_encoder(datetime, datetime.isoformat)
+        self.register_encoder(Point, lambda p: {"x": p.x, "y": p.y})
+        created = [datetime(2024, 1, 2), datetime(2024, 3, 4)]
+        self.assert_same_encoding(
+            {
+                "created": created,
+                "point": Point(1, 2),
+                "points": [Point(3, 4)],
+                "pair": (5, 6),
+            },
+            {
+                "created": ["2024-01-02T00:00:00", "2024-03-04T00:00:00"],
+                "point": {"x": 1, "y": 2},
+                "points": [{"x": 3, "y": 4}],
+                "pair": [5, 6],
+            },
+        )
+        self.assertEqual(
+            "created=2024-01-02T00%3A00%3A00&created=2024-03-04T00%3A00%3A00",
+            json_obj_to_query_str({"created": created}),
+        )
+
+    def test_encoder_called_once_per_item(self):
+        calls = []
+
+        def encode_point(point):
+            calls.append(point)
+            return {"x": point.x, "y": point.y}
+
+        self.register_encoder(Point, encode_point)
+        points = [Point(1, 2), Point(3, 4)]
+        json_obj_to_query_str({"points": points})
+        self.assertEqual(points, calls)
+
+    def test_lookup_racing_registration(self):
+        self.register_encoder(datetime, datetime.isoformat)
+        # A lookup which read the registry before Point was registered
+        old_state = _ENCODERS.state
+        self.register_encoder(Point, lambda p: {"x": p.x, "y": p.y})
+        old_state[1][Point] = None
+        self.assertEqual("p.x=1&p.y=2", json_obj_to_query_str({"p": Point(1, 2)}))
+
+    def test_register_while_encoding(self):
+        types = [type(f"Type{i}", (), {}) for i in range(50)]
+
+        def register(type_):
+            self.register_encoder(type_, lambda _: 1)
+
+        def encode(type_):
+            for _ in range(20):
+                with suppress(JsonUrleyError):  # Possibly not yet registered
+                    json_obj_to_query_str({"a": type_()})
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = []
+            for type_ in types:
+                futures.append(executor.submit(encode, type_))
+                futures.append(executor.submit(register, type_))
+            for future in futures:
+                future.result()
+        for type_ in types:
+            self.assertEqual("a=1", json_obj_to_query_str({"a": type_()}))
@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch
+
+from json_urley import (
+    query_str_to_json_obj,
+    QueryCache,
+    QueryCacheStats,
+    JsonUrleyError,
+)
+
+
+class TestQueryCache(TestCase):
+    def test_hit_and_miss(self):
+        cache = QueryCache()
+        query_str = "a=1&b~a.n.c=x&b.n.c=y&d~o="
+        result = cache.query_str_to_json_obj(query_str)
+        self.assertIs(result, cache.query_str_to_json_obj(query_str))
+        self.assertEqual(QueryCacheStats(hits=1, misses=1), cache.stats)
+        self.assertEqual(1, result["a"])
+        self.assertEqual(("x", "y"), tuple(item["c"] for item in result["b"]))
+        self.assertEqual({}, result["d"])
+
+    def test_bytes(self):
+        cache = QueryCache()
+        result = cache.query_str_to_json_obj(b"name=S%C3%A3o+Paulo")
+        self.assertEqual({"name": "São Paulo"}, result)
+
+    def test_frozen(self):
+        cache = QueryCache()
+        result = cache.query_str_to_json_obj("a.b=1&a.b=2")
+        with self.assertRaises(TypeError):
+            result["c"] = 1
+        with self.assertRaises(TypeError):
+            result["a"]["b"] = 3
+        with self.assertRaises(AttributeError):
+            result["a"]["b"].append(3)
+        self.assertEqual({"a": {"b": [1, 2]}}, query_str_to_json_obj("a.b=1&a.b=2"))
+
+    def test_lru_eviction(self):
+        cache = QueryCache(max_size=2, shards=1)
+        cache.query_str_to_json_obj("a=1")
+        cache.query_str_to_json_obj("a=2")
+        cache.query_str_to_json_obj("a=1")
+        cache.query_str_to_json_obj("a=3")
+        cache.query_str_to_json_obj("a=1")
+        self.assertEqual(QueryCacheStats(hits=2, misses=3, evictions=1), cache.stats)
+        cache.query_str_to_json_obj("a=2")
+        self.assertEqual(QueryCacheStats(hits=2, misses=4, evictions=2), cache.stats)
+
+    def test_ttl(self):
+        cache = QueryCache(ttl=10)
+        with patch("json_urley.query_cache.monotonic", return_value=100):
+            cache.query_str_to_json_obj("a=1")
+        with patch("json_urley.query_cache.monotonic", return_value=109):
+            cache.query_str_to_json_obj("a=1")
+        with patch("json_urley.query_cache.monotonic", return_value=110):
+            cache.query_str_to_json_obj("a=1")
+        self.assertEqual(QueryCacheStats(hits=1, misses=2, evictions=1), cache.stats)
+
+    def test_errors_not_cached(self):
+        cache = QueryCache()
+        for _ in range(2):
+            with self.assertRaises(JsonUrleyError):
+                cache.query_str_to_json_obj("a~x=1")
+        self.assertEqual(QueryCacheStats(misses=2), cache.stats)
+
+    def test_clear(self):
+        cache = QueryCache()
+        cache.query_str_to_json_obj("a=1")
+        cache.clear()
+        cache.query_str_to_json_obj("a=1")
+        self.assertEqual(QueryCacheStats(misses=2), cache.stats)
+
+    def test_max_size(self):
+        for max_size in (0, 1, 5, 16, 100):
+            cache = QueryCache(max_size=max_size, shards=16)
+            for i in range(300):
+                cache.query_str_to_json_obj(f"a={i}")
+                self.assertLessEqual(len(cache), max_size)
+            self.assertEqual(max_size > 0, len(cache) > 0)
+
+    def test_max_size_zero(self):
+        cache = QueryCache(max_size=0)
+        cache.query_str_to_json_obj("a=1")
+        cache.query_str_to_json_obj("a=1")
+        self.assertEqual(QueryCacheStats(misses=2), cache.stats)
+
+    def test_threads(self):
+        cache = QueryCache(max_size=64, shards=4)
+        query_strs = [f"a={i}&b.c~a.n=x&b.c.n={i}" for i in range(100)]
+
+        def decode(query_str):
+            expected = query_str_to_json_obj(query_str)
+            for _ in range(20):
+                result = cache.query_str_to_json_obj(query_str)
+                self.assertEqual(expected["a"], result["a"])
+                self.assertEqual(tuple(expected["b"]["c"]), result["b"]["c"])
+            return True
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(decode, query_strs * 4))
+        self.assertTrue(all(results))
+        stats = cache.stats
+        self.assertEqual(len(query_strs) * 4 * 20, stats.hits + stats.misses)
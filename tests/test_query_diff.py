@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from unittest import TestCase
+
+from json_urley import (
+    json_obj_to_query_params,
+    query_params_to_json_obj,
+    diff_query_params,
+    apply_query_diff,
+    QueryDiff,
+    JsonUrleyError,
+    register_encoder,
+    _ENCODERS,
+)
+
+
+@dataclass
+class P:
+    x: object
+
+
+STATES = [
+    {},
+    {"page": 1, "sort": "name", "filter": {"tags": ["a", "b"], "active": True}},
+    {"page": 2, "sort": "name", "filter": {"tags": ["a", "b"], "active": True}},
+    {"page": 2, "filter": {"tags": ["a"], "active": True}, "q": "São Paulo"},
+    {"page": True, "filter": {"tags": ["a"], "active": 1}, "q": "São Paulo"},
+    {"page": 2.0, "filter": {"tags": [["a"]], "active": 1}, "a.b~c": []},
+    {"page": 2.0, "filter": {"tags": [["b"]], "other": 1}, "a.b~c": {}},
+]
+
+
+class TestQueryDiff(TestCase):
+    def test_diff_and_apply(self):
+        for old_obj in STATES:
+            for new_obj in STATES:
+                diff = diff_query_params(old_obj, new_obj)
+                old_params = json_obj_to_query_params(old_obj)
+                new_params = [p for p in old_params if p not in diff.removed]
+                new_params.extend(diff.added)
+                self.assertEqual(new_obj, query_params_to_json_obj(new_params))
+                json_obj = query_params_to_json_obj(old_params)
+                self.assertIs(json_obj, apply_query_diff(json_obj, diff))
+                self.assertEqual(new_obj, json_obj)
+
+    def test_unchanged_keys_not_encoded(self):
+        diff = diff_query_params(STATES[1], STATES[2])
+        self.assertEqual(QueryDiff([("page", "1")], [("page", "2")]), diff)
+
+    def test_apply_empty_key(self):
+        json_obj = {"": 1, "a": 2}
+        apply_query_diff(json_obj, QueryDiff(removed=[("", "1")]))
+        self.assertEqual({"a": 2}, json_obj)
+
+    def assert_diff(self, old_value, new_value, is_same: bool):
+        diff = diff_query_params({"p": old_value}, {"p": new_value})
+        if is_same:
+            self.assertEqual(QueryDiff(), diff)
+        else:
+            expected = QueryDiff(
+                json_obj_to_query_params({"p": old_value}),
+                json_obj_to_query_params({"p": new_value}),
+            )
+            self.assertEqual(expected, diff)
+
+    def test_native_types(self):
+        self.assert_diff((1, 2), (1, 2), True)
+        self.assert_diff((1, 2), (1.0, 2), False)
+        self.assert_diff((1, 2), (1, 2, 3), False)
+        self.assert_diff(MappingProxyType({"x": 1}), MappingProxyType({"x": 1}), True)
+        self.assert_diff(
+            MappingProxyType({"x": 1}), MappingProxyType({"x": True}), False
+        )
+        self.assert_diff(MappingProxyType({"x": 1}), MappingProxyType({"y": 1}), False)
+        self.assert_diff(P((1, {"y": [2]})), P((1, {"y": [2]})), True)
+        self.assert_diff(P(1), P(True), False)
+        with self.assertRaises(JsonUrleyError):
+            diff_query_params({"p": b"ab"}, {"p": b"ab"})
+
+    def test_encoded_types(self):
+        self.addCleanup(setattr, _ENCODERS, "state", _ENCODERS.state)
+        register_encoder(datetime, datetime.isoformat)
+        self.assert_diff(datetime(2024, 1, 2), datetime(2024, 1, 2), False)
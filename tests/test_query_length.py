@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from unittest import TestCase
+
+from json_urley import json_obj_to_query_str, estimate_query_length, fits_in
+
+
+@dataclass
+class Page:
+    q: str
+    page: int = 1
+
+
+JSON_OBJS = [
+    {},
+    {"a": 1},
+    {"": ""},
+    {"name": "José", "city": "São Paulo", "emoji": "😀"},
+    {"a b": "c&d=e+f/g?h%i#j"},
+    {"a.b~c": {"d": [1, 2.5, None, True, "1"]}},
+    {"users": [{"name": "John", "age": 30}, {"name": "Jane", "tags": []}]},
+    {"points": [[1, 2], [3, 4]], "empty": {}},
+    Page("São Paulo"),
+    MappingProxyType({"a b": (1, 2), "c": MappingProxyType({})}),
+    MappingProxyType({}),
+    (),
+    None,
+]
+
+
+class TestQueryLength(TestCase):
+    def test_estimate_query_length(self):
+        for json_obj in JSON_OBJS:
+            expected = len(json_obj_to_query_str(json_obj))
+            self.assertEqual(expected, estimate_query_length(json_obj))
+
+    def test_fits_in(self):
+        for json_obj in JSON_OBJS:
+            length = len(json_obj_to_query_str(json_obj))
+            self.assertTrue(fits_in(json_obj, length))
+            self.assertEqual(length == 0, fits_in(json_obj, length - 1))
+
+    def test_fits_in_stops_early(self):
+        consumed = []
+
+        class JsonObj(dict):
+            def items(self):
+                for key in ("a", "b"):
+                    consumed.append(key)
+                    yield key, "c" * 20
+
+        self.assertFalse(fits_in(JsonObj(a=1), 10))
+        self.assertEqual(["a"], consumed)
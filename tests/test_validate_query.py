@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+from json_urley import (
+    query_str_to_json_obj,
+    validate_query,
+    validate_query_params,
+    JsonUrleyError,
+)
+
+
+class TestValidateQuery(TestCase):
+    def assert_matches_decode(self, query_str: str):
+        try:
+            query_str_to_json_obj(query_str)
+            expected = None
+        except JsonUrleyError as e:
+            expected = str(e)
+        result = validate_query(query_str)
+        self.assertEqual(expected, None if result is None else str(result[1]))
+
+    def test_matches_decode(self):
+        query_strs = [
+            "",
+            "a=1&b=true&a=2",
+            "a~s=b&a~i=1",
+            "foo.flag=false&foo.value=2",
+            "foo~a.n.c=a&foo.e.d=b&foo.n.c=b",
+            "foo~a.e~a.e~a.e=1",
+            "foo~a.n~a.n~a.n=1&foo~a.n~a.n~a.n=2&foo~a.e~a.e~a.e=3",
+            "a~a=&a.n=1&a.e=2",
+            "a~a=&a=1&a.e.b=2",
+            "a~o=&a=1&a.e=2",
+            "a~o=&a.b=1",
+            "a=1&a=2&a.e.b=1",
+            "a~~a=1&a~~~.b=1",
+            "a~x=1",
+            "a~i=x",
+            "a~a=1",
+            "a~a=&a.b=1",
+            "value=1&value.child=2",
+            "value=1&value.child.grandchild=2",
+            "foo~a.b.c=1",
+            "foo.bar~s.zap=1",
+            "a~a=&a.e=1&a.e.b=2",
+            "a~=1",
+            "=1",
+        ]
+        for query_str in query_strs:
+            self.assert_matches_decode(query_str)
+
+    def test_error_position(self):
+        index, error = validate_query_params([("a", "1"), ("b", "2"), ("a.c", "3")])
+        self.assertEqual(2, index)
+        self.assertEqual(
+            "path_mismatch:PathElement(key='c', type_hint=None)", str(error)
+        )
+
+    def test_invalid_path_position(self):
+        self.assertEqual(1, validate_query("a=1&a~=1")[0])
+        self.assertEqual(1, validate_query("a=1&=1")[0])
+
+    def test_valid(self):
+        self.assertIsNone(validate_query("name=John&age=21&interests~a.n.type=sport"))